@@ -7,6 +7,13 @@ Contains all constants and configuration parameters.
 DEFAULT_MODEL_PATH = 'yolov8n.pt'
 MIDAS_MODEL_NAME = 'MiDaS_small'
 
+# Compile MiDaS with torch.compile on CUDA (one-time compile cost at startup)
+USE_TORCH_COMPILE = True
+
+# TensorRT Configuration (used only when TensorRT and CUDA are available)
+USE_TENSORRT = False
+TRT_CACHE_DIR = '~/.cache/avpss'  # Where exported ONNX models and engines are cached
+
 # Road-specific object classes for detection
 ROAD_CLASSES = {
     'person': 0,
@@ -17,11 +24,13 @@ ROAD_CLASSES = {
     'train': 6,
     'truck': 7,
 }
+ROAD_CLASS_IDS = frozenset(ROAD_CLASSES.values())  # O(1) membership tests per box
 
 # Detection Configuration
 CONFIDENCE_THRESHOLD = 0.5
 DEPTH_SAMPLE_SIZE = 10
 DEPTH_COLLISION_SAMPLE_SIZE = 5
+DEPTH_FRAME_STRIDE = 2  # Run MiDaS every N frames and reuse the last depth map in between
 
 # Warning System Configuration
 WARNING_THRESHOLD = 3  # Frames required for warning to appear
@@ -30,6 +39,7 @@ COLLISION_ALERT_THRESHOLD = 2  # Frames required for collision alert to appear
 
 # MiDaS Transform Configuration
 MIDAS_INPUT_SIZE = 384
+MIDAS_INPUT_SIZE_FAST = 256  # Used with fast_depth / --fast-depth (~0.44x the MiDaS compute)
 MIDAS_MEAN = [0.485, 0.456, 0.406]
 MIDAS_STD = [0.229, 0.224, 0.225]
 
@@ -66,11 +76,14 @@ FONT = {
 # Grid Configuration
 GRID_COLS = 4
 GRID_ROWS = 3
-ROI_GRID_POSITIONS = [(2, 2), (2, 3), (4, 2), (4, 3)]  # Central squares of bottom row
+ROI_CELLS = [(2, 1), (2, 2)]  # Collision ROI as (row, col) grid cells, 0-indexed: central squares of bottom row
 
 # Video Configuration
-DEFAULT_FOURCC = 'mp4v'
+DEFAULT_FOURCC = 'avc1'  # H.264 (hardware-accelerated where the backend supports it)
+FALLBACK_FOURCC = 'mp4v'  # Used when the H.264 writer cannot be opened
 PROGRESS_UPDATE_INTERVAL = 30  # Print progress every N frames
+DEFAULT_BATCH_SIZE = 8  # Frames per inference batch for offline (no display) processing
+FRAME_QUEUE_SIZE = 8  # Max decoded/annotated frames buffered between I/O threads and inference
 
 # Camera Configuration
 DEFAULT_CAMERA_INDEX = 0
@@ -7,7 +7,7 @@ import argparse
 import sys
 from avpss.models.detector import RoadObjectDetector
 from avpss.config.settings import (
-    DEFAULT_MODEL_PATH, DEFAULT_CAMERA_INDEX, 
+    DEFAULT_MODEL_PATH, DEFAULT_CAMERA_INDEX, DEFAULT_BATCH_SIZE,
     SHOW_DETECTIONS, SHOW_ROI, SHOW_WARNINGS, SHOW_COLLISION_ALERTS
 )
 
@@ -31,6 +31,12 @@ def main():
                        help='Disable video display')
     parser.add_argument('--no-depth', action='store_true',
                        help='Disable depth estimation (faster processing)')
+    parser.add_argument('--fast-depth', action='store_true',
+                       help='Run MiDaS at a lower input resolution (faster, coarser depth)')
+    parser.add_argument('--tensorrt', action='store_true',
+                       help='Use FP16 TensorRT engines for YOLO and MiDaS (built on first use)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help='Frames per inference batch in video mode (used with --no-display)')
     parser.add_argument('--show-config', action='store_true',
                        help='Show current display configuration and exit')
     
@@ -53,7 +59,7 @@ def main():
     print(f"Display mode: {'Warnings only' if not SHOW_DETECTIONS and not SHOW_ROI else 'Full detection'}")
     
     try:
-        detector = RoadObjectDetector(args.model)
+        detector = RoadObjectDetector(args.model, use_tensorrt=args.tensorrt, fast_depth=args.fast_depth)
     except Exception as e:
         print(f"Error initializing detector: {e}")
         return
@@ -69,7 +75,8 @@ def main():
                 video_path=args.path,
                 output_path=args.output,
                 display=not args.no_display,
-                use_depth=not args.no_depth
+                use_depth=not args.no_depth,
+                batch_size=args.batch_size
             )
         
         elif args.mode == 'camera':
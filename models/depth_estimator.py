@@ -4,16 +4,25 @@ Handles depth map generation and distance estimation.
 """
 
 import torch
-import torchvision.transforms as transforms
+import torch.nn.functional as F
 import numpy as np
-from PIL import Image
 import cv2
 
+from avpss.models.tensorrt_engine import TensorRTEngine, tensorrt_available
+from avpss.utils.depth_sampling import frame_to_depth_scale, sample_median_depth
 from avpss.config.settings import (
-    MIDAS_MODEL_NAME, MIDAS_INPUT_SIZE, MIDAS_MEAN, MIDAS_STD,
-    DEPTH_SAMPLE_SIZE, CLOSE_DEPTH_THRESHOLD
+    MIDAS_MODEL_NAME, MIDAS_INPUT_SIZE, MIDAS_INPUT_SIZE_FAST, MIDAS_MEAN, MIDAS_STD,
+    DEPTH_SAMPLE_SIZE, DEPTH_COLLISION_SAMPLE_SIZE, CLOSE_DEPTH_THRESHOLD, USE_TENSORRT,
+    USE_TORCH_COMPILE
 )
 
+# Lookup table for the CPU preprocessing path: MIDAS_NORM_LUT[c, v] is the
+# normalized float value of uint8 v in RGB channel c
+MIDAS_NORM_LUT = ((np.arange(256, dtype=np.float32)[None, :] / 255.0 
+                   - np.array(MIDAS_MEAN, dtype=np.float32)[:, None]) 
+                  / np.array(MIDAS_STD, dtype=np.float32)[:, None]).astype(np.float32)
+_LUT_CHANNELS = np.arange(3)[:, None, None]
+
 
 class DepthEstimator:
     """
@@ -21,55 +30,339 @@ class DepthEstimator:
     Provides depth maps and distance estimation for objects.
     """
     
-    def __init__(self):
+    def __init__(self, use_tensorrt: bool = USE_TENSORRT, use_compile: bool = USE_TORCH_COMPILE,
+                 fast_depth: bool = False):
         """
         Initialize the MiDaS depth estimation model.
+        
+        Args:
+            use_tensorrt: Run MiDaS through a cached FP16 TensorRT engine when available
+            use_compile: Compile MiDaS with torch.compile for single-frame CUDA inference
+            fast_depth: Use the smaller MIDAS_INPUT_SIZE_FAST input resolution
         """
         print("Loading MiDaS depth model...")
+        
+        # MiDaS cost grows with the square of the input size; coarse depth at box
+        # centers is all the warning logic needs
+        self.input_size = MIDAS_INPUT_SIZE_FAST if fast_depth else MIDAS_INPUT_SIZE
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        
+        # Half precision only pays off (and is only fully supported) on CUDA
+        self.use_half = self.device.type == 'cuda'
+        self.dtype = torch.float16 if self.use_half else torch.float32
+        
+        # On CUDA let cuDNN autotune the fixed-shape convolutions and use NHWC
+        # (channels-last) tensors, which map onto the tensor-core FP16 kernels
+        self.memory_format = torch.channels_last if self.use_half else torch.contiguous_format
+        if self.use_half:
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+        
         self.depth_model = torch.hub.load('intel-isl/MiDaS', MIDAS_MODEL_NAME)
+        self.depth_model.to(self.device)
         self.depth_model.eval()
         
-        # Setup transforms for MiDaS
-        self.transform = transforms.Compose([
-            transforms.Resize(MIDAS_INPUT_SIZE),
-            transforms.CenterCrop(MIDAS_INPUT_SIZE),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=MIDAS_MEAN, std=MIDAS_STD)
-        ])
+        # Optional TensorRT engine (built from the FP32 model before it is halved)
+        self.trt_engine = None
+        if use_tensorrt:
+            self.trt_engine = self._load_tensorrt_engine()
+        
+        if self.use_half:
+            self.depth_model.to(memory_format=self.memory_format).half()
+        
+        # Normalization constants built once from the settings lists and kept on the
+        # device, so no per-frame tensor construction or host-to-device copy is needed
+        self._mean = torch.tensor(MIDAS_MEAN, device=self.device, dtype=self.dtype).view(1, 3, 1, 1)
+        self._std = torch.tensor(MIDAS_STD, device=self.device, dtype=self.dtype).view(1, 3, 1, 1)
+        
+        # Pinned host staging buffer for asynchronous uploads (allocated per frame shape)
+        self._staging = None
+        self._staging_event = None
+        
+        # Persistent single-frame model input, refilled in place every frame
+        self._in = torch.empty((1, 3, self.input_size, self.input_size), device=self.device, 
+                               dtype=self.dtype, memory_format=self.memory_format)
+        
+        # Compiled model for the fixed-shape single-frame path (batches stay eager
+        # so varying batch sizes do not trigger recompilation)
+        self.compiled_model = None
+        if use_compile and self.use_half and self.trt_engine is None:
+            self.compiled_model = self._compile_model()
         
         print("MiDaS model loaded successfully!")
     
-    def get_depth_map(self, frame: np.ndarray) -> np.ndarray:
+    def _compile_model(self):
+        """
+        Compile MiDaS with torch.compile and warm it up on the persistent input
+        buffer, so the first real frame does not pay the compilation cost.
+        
+        Returns:
+            Compiled model, or None if compilation is not possible
+        """
+        if not hasattr(torch, 'compile'):
+            return None
+        
+        print("Compiling MiDaS model...")
+        try:
+            compiled_model = torch.compile(self.depth_model, mode='reduce-overhead', 
+                                           fullgraph=False, dynamic=False)
+            self._in.zero_()
+            with torch.inference_mode(), torch.autocast('cuda', dtype=torch.float16):
+                # CUDA graphs are recorded over the first few calls
+                for _ in range(3):
+                    torch.compiler.cudagraph_mark_step_begin()
+                    compiled_model(self._in)
+            torch.cuda.synchronize()
+            return compiled_model
+        except Exception as e:
+            print(f"Could not compile MiDaS, using eager mode: {e}")
+            return None
+    
+    def _load_tensorrt_engine(self):
+        """
+        Build (once) and load an FP16 TensorRT engine for the MiDaS model.
+        
+        Returns:
+            TensorRTEngine, or None if TensorRT cannot be used
+        """
+        if not tensorrt_available():
+            print("TensorRT not available, using PyTorch MiDaS")
+            return None
+        
+        try:
+            engine_path = TensorRTEngine.build(
+                self.depth_model, (1, 3, self.input_size, self.input_size),
+                f"{MIDAS_MODEL_NAME}_{self.input_size}_fp16.trt"
+            )
+            return TensorRTEngine(engine_path)
+        except Exception as e:
+            print(f"Could not load TensorRT engine, using PyTorch MiDaS: {e}")
+            return None
+    
+    def _preprocess_gpu(self, frame: np.ndarray) -> torch.Tensor:
+        """
+        Convert a BGR frame into a normalized MiDaS input tensor on the device.
+        The raw uint8 frame is uploaded once; channel swap, resize and
+        normalization all run as tensor ops on the device.
+        
+        Args:
+            frame: Input frame (BGR format, uint8), or a stacked (B, H, W, 3) batch
+            
+        Returns:
+            input_tensor: Tensor of shape (B, 3, input_size, input_size).
+                          For a single frame this is the reused self._in buffer.
+        """
+        t = self._upload(frame)
+        if t.dim() == 3:
+            t = t.unsqueeze(0)
+        
+        # NHWC BGR -> NCHW RGB
+        t = t.permute(0, 3, 1, 2)[:, [2, 1, 0]]
+        
+        input_tensor = F.interpolate(
+            t.to(self.dtype).div_(255),
+            size=(self.input_size, self.input_size),
+            mode='bilinear',
+            align_corners=False
+        )
+        if len(input_tensor) == 1:
+            input_tensor = self._in.copy_(input_tensor)
+        else:
+            input_tensor = input_tensor.contiguous(memory_format=self.memory_format)
+        return input_tensor.sub_(self._mean).div_(self._std)
+    
+    def _preprocess_cpu(self, frame: np.ndarray) -> torch.Tensor:
+        """
+        Convert a BGR frame into a normalized MiDaS input tensor without CUDA.
+        Uses a single cv2.resize, a channel-swap view and one table lookup per
+        pixel in place of the float scale, subtract and divide.
+        
+        Args:
+            frame: Input frame (BGR format, uint8), or a stacked (B, H, W, 3) batch
+            
+        Returns:
+            input_tensor: Tensor of shape (B, 3, input_size, input_size)
+        """
+        frames = frame[None] if frame.ndim == 3 else frame
+        
+        batch = np.empty((len(frames), 3, self.input_size, self.input_size), dtype=np.float32)
+        for i, f in enumerate(frames):
+            resized = cv2.resize(f, (self.input_size, self.input_size), interpolation=cv2.INTER_LINEAR)
+            rgb_chw = resized.transpose(2, 0, 1)[::-1]
+            batch[i] = MIDAS_NORM_LUT[_LUT_CHANNELS, rgb_chw]
+        
+        input_tensor = torch.from_numpy(batch)
+        if len(input_tensor) == 1:
+            input_tensor = self._in.copy_(input_tensor)
+        return input_tensor
+    
+    def _upload(self, frame: np.ndarray) -> torch.Tensor:
+        """
+        Copy a uint8 frame (or batch) to the device. On CUDA the frame is staged
+        in pinned memory so the copy runs asynchronously on the current stream.
+        
+        Args:
+            frame: Input frame(s) as a uint8 numpy array
+            
+        Returns:
+            Tensor on self.device with the same shape as the frame
+        """
+        host = torch.from_numpy(frame)
+        if self.device.type != 'cuda':
+            return host
+        
+        if self._staging is None or self._staging.shape != host.shape:
+            self._staging = torch.empty(host.shape, dtype=torch.uint8, pin_memory=True)
+            self._staging_event = None
+        elif self._staging_event is not None:
+            # Previous upload must finish reading the buffer before it is refilled
+            self._staging_event.synchronize()
+        
+        self._staging.copy_(host)
+        t = self._staging.to(self.device, non_blocking=True)
+        self._staging_event = torch.cuda.Event()
+        self._staging_event.record()
+        return t
+    
+    @torch.inference_mode()
+    def _infer(self, frames: np.ndarray) -> torch.Tensor:
+        """
+        Run a single MiDaS forward pass over one frame or a stacked batch.
+        
+        Args:
+            frames: Input frame (BGR format) or stacked (B, H, W, 3) batch
+            
+        Returns:
+            depth_prediction: (B, H, W) depth tensor on self.device
+        """
+        if self.device.type == 'cuda':
+            input_tensor = self._preprocess_gpu(frames)
+        else:
+            input_tensor = self._preprocess_cpu(frames)
+        
+        if self.trt_engine is not None:
+            # The engine has a fixed batch of 1 and returns the same output
+            # buffer on every call, so each frame's result must be copied out
+            if len(input_tensor) == 1:
+                return self.trt_engine(input_tensor)
+            return torch.cat([self.trt_engine(x.unsqueeze(0)).clone() for x in input_tensor])
+        
+        # Get depth prediction
+        with torch.autocast(self.device.type, dtype=torch.float16, enabled=self.use_half):
+            if self.compiled_model is not None and input_tensor is self._in:
+                torch.compiler.cudagraph_mark_step_begin()
+                return self.compiled_model(input_tensor)
+            return self.depth_model(input_tensor)
+    
+    def get_depth_map(self, frame: np.ndarray) -> torch.Tensor:
         """
         Get depth map for the input frame using MiDaS.
+        The map stays on the device; use get_depth_map_np for a numpy copy.
+        
+        Args:
+            frame: Input frame (BGR format)
+            
+        Returns:
+            depth_map: Depth map as a 2-D tensor on self.device
+        """
+        return self._infer(frame)[0]
+    
+    def get_depth_map_batch(self, frames: list) -> torch.Tensor:
+        """
+        Get depth maps for several same-sized frames in one forward pass.
+        
+        Args:
+            frames: List of input frames (BGR format)
+            
+        Returns:
+            depth_maps: (B, H, W) depth tensor on self.device
+        """
+        return self._infer(np.stack(frames))
+    
+    def get_depth_map_np(self, frame: np.ndarray, full_resolution: bool = False) -> np.ndarray:
+        """
+        Get depth map for the input frame as a numpy array, for CPU consumers
+        such as color-mapped depth overlays.
         
         Args:
             frame: Input frame (BGR format)
+            full_resolution: Upscale the map to the frame size (nearest neighbour)
             
         Returns:
             depth_map: Depth map as numpy array
         """
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_frame)
+        depth_map = self.get_depth_map(frame)
+        if full_resolution:
+            depth_map = F.interpolate(depth_map[None, None].float(), size=frame.shape[:2], 
+                                      mode='nearest')[0, 0]
+        return depth_map.float().cpu().numpy()
+    
+    @torch.inference_mode()
+    def sample_boxes(self, depth_map: torch.Tensor, boxes_xyxy: torch.Tensor, 
+                     sample_size: int = DEPTH_COLLISION_SAMPLE_SIZE, 
+                     frame_shape: tuple = None) -> torch.Tensor:
+        """
+        Get the median depth around the center of every bounding box at once.
+        Uses the same clipped stride-2 window as window_median (the window
+        shrinks at the map border instead of repeating edge pixels), gathered
+        for all boxes in a single indexing op on the device.
         
-        # Apply transforms
-        input_tensor = self.transform(pil_image).unsqueeze(0)
+        Args:
+            depth_map: Depth map tensor from get_depth_map
+            boxes_xyxy: Bounding boxes as an (N, 4) tensor, in frame coordinates
+            sample_size: Size of sampling area around each center (depth map pixels)
+            frame_shape: (height, width) of the frame the boxes refer to; box
+                         coordinates are scaled into depth map space with
+                         frame_to_depth_scale. None if the boxes are already
+                         in depth map coordinates.
+            
+        Returns:
+            medians: (N,) tensor of median depth values
+        """
+        if len(boxes_xyxy) == 0:
+            return torch.empty(0, device=depth_map.device)
         
-        # Get depth prediction
-        with torch.no_grad():
-            depth_prediction = self.depth_model(input_tensor)
-            depth_map = depth_prediction.squeeze().cpu().numpy()
+        height, width = depth_map.shape[-2:]
+        boxes = boxes_xyxy.to(depth_map.device)
+        if frame_shape is not None:
+            sx, sy = frame_to_depth_scale((height, width), frame_shape)
+            boxes = boxes * boxes.new_tensor([sx, sy, sx, sy])
+        centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).long()
         
-        return depth_map
+        # Clamp the centers into the map and the windows to the map edges, as
+        # window_median does; samples start at the clipped window start
+        cx = centers[:, 0].clamp(0, width - 1)
+        cy = centers[:, 1].clamp(0, height - 1)
+        x0, x1 = (cx - sample_size).clamp(min=0), (cx + sample_size).clamp(max=width)
+        y0, y1 = (cy - sample_size).clamp(min=0), (cy + sample_size).clamp(max=height)
+        offsets = torch.arange(0, 2 * sample_size, 2, device=depth_map.device)
+        gx = x0[:, None] + offsets
+        gy = y0[:, None] + offsets
+        
+        # (N, 1, k) and (N, k, 1) grids broadcast to (N, k, k) sample indices;
+        # indices past the clipped window are masked out of the median
+        valid = ((gy < y1[:, None])[:, :, None] & (gx < x1[:, None])[:, None, :]).reshape(len(boxes), -1)
+        samples = depth_map[gy.clamp(max=height - 1)[:, :, None], gx.clamp(max=width - 1)[:, None, :]]
+        samples = samples.reshape(len(boxes), -1).float().masked_fill(~valid, float('inf'))
+        
+        # Masked samples sort last; average the two middle valid values, matching np.median
+        ordered = samples.sort(dim=-1).values
+        count = valid.sum(dim=-1, keepdim=True)
+        lower = ordered.gather(1, (count - 1) // 2)
+        upper = ordered.gather(1, count // 2)
+        return ((lower + upper) / 2).squeeze(1)
     
-    def estimate_distance(self, depth_map: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> str:
+    def estimate_distance(self, depth_map: np.ndarray, x1: int, y1: int, x2: int, y2: int, 
+                          frame_shape: tuple = None) -> str:
         """
         Estimate relative distance from depth map at bounding box location.
         
         Args:
-            depth_map: Depth map from MiDaS
-            x1, y1, x2, y2: Bounding box coordinates
+            depth_map: Depth map from MiDaS (numpy array or device tensor)
+            x1, y1, x2, y2: Bounding box coordinates (frame coordinates)
+            frame_shape: (height, width) of the frame; None if the box is already
+                         in depth map coordinates
             
         Returns:
             distance_category: String indicating relative distance
@@ -78,17 +371,9 @@ class DepthEstimator:
         center_x = int((x1 + x2) / 2)
         center_y = int((y1 + y2) / 2)
         
-        # Sample depth values around the center point
-        depth_values = []
-        
-        for dx in range(-DEPTH_SAMPLE_SIZE, DEPTH_SAMPLE_SIZE, 2):
-            for dy in range(-DEPTH_SAMPLE_SIZE, DEPTH_SAMPLE_SIZE, 2):
-                sample_x = max(0, min(depth_map.shape[1]-1, center_x + dx))
-                sample_y = max(0, min(depth_map.shape[0]-1, center_y + dy))
-                depth_values.append(depth_map[sample_y, sample_x])
-        
-        # Get median depth value (more robust than mean)
-        median_depth = np.median(depth_values)
+        # Get median depth value around the center (more robust than mean)
+        median_depth = self.get_depth_at_location(depth_map, center_x, center_y, DEPTH_SAMPLE_SIZE, 
+                                                  frame_shape=frame_shape)
         
         # Convert to relative distance categories
         # Higher depth values = closer objects in MiDaS
@@ -97,24 +382,42 @@ class DepthEstimator:
         else:
             return f"Normal ({median_depth:.2f})"
     
-    def get_depth_at_location(self, depth_map: np.ndarray, center_x: int, center_y: int, sample_size: int = 5) -> float:
+    @torch.inference_mode()
+    def get_depth_at_location(self, depth_map: np.ndarray, center_x: int, center_y: int, 
+                              sample_size: int = 5, frame_shape: tuple = None) -> float:
         """
         Get median depth value at a specific location with sampling.
         
         Args:
-            depth_map: Depth map from MiDaS
-            center_x, center_y: Center coordinates
-            sample_size: Size of sampling area around center
+            depth_map: Depth map from MiDaS (numpy array or device tensor)
+            center_x, center_y: Center coordinates (frame coordinates)
+            sample_size: Size of sampling area around center (depth map pixels)
+            frame_shape: (height, width) of the frame; None if the center is
+                         already in depth map coordinates
             
         Returns:
             median_depth: Median depth value at the location
         """
-        depth_values = []
+        sx, sy = frame_to_depth_scale(depth_map.shape[-2:], frame_shape)
+        center_x = int(center_x * sx)
+        center_y = int(center_y * sy)
+        
+        if not isinstance(depth_map, torch.Tensor):
+            return float(sample_median_depth(depth_map, center_x, center_y, sample_size, 2))
+        
+        height, width = depth_map.shape[:2]
+        
+        # Keep the center inside the map so the window is never empty
+        center_x = max(0, min(width - 1, center_x))
+        center_y = max(0, min(height - 1, center_y))
+        
+        y0 = max(0, center_y - sample_size)
+        y1 = min(height, center_y + sample_size)
+        x0 = max(0, center_x - sample_size)
+        x1 = min(width, center_x + sample_size)
         
-        for dx in range(-sample_size, sample_size, 2):
-            for dy in range(-sample_size, sample_size, 2):
-                sample_x = max(0, min(depth_map.shape[1]-1, center_x + dx))
-                sample_y = max(0, min(depth_map.shape[0]-1, center_y + dy))
-                depth_values.append(depth_map[sample_y, sample_x])
+        # Same stride-2 sampling grid, taken as a single array slice
+        patch = depth_map[y0:y1:2, x0:x1:2]
         
-        return np.median(depth_values)
+        # quantile(0.5) averages the two middle values, matching np.median
+        return float(torch.quantile(patch.float().flatten(), 0.5))
@@ -6,8 +6,12 @@ Coordinates all components for road object detection with depth estimation.
 import cv2
 import os
 import sys
+import queue
+import threading
+from contextlib import nullcontext
 from pathlib import Path
 import numpy as np
+import torch
 
 # Try to import YOLO with error handling
 try:
@@ -22,9 +26,10 @@ from avpss.utils.roi_manager import ROIManager
 from avpss.utils.visualization import Visualizer
 from avpss.utils.warnings import WarningSystem
 from avpss.config.settings import (
-    DEFAULT_MODEL_PATH, ROAD_CLASSES, PROGRESS_UPDATE_INTERVAL, 
-    DEFAULT_FOURCC, DEFAULT_CAMERA_INDEX, SHOW_DETECTIONS, SHOW_ROI, 
-    SHOW_WARNINGS, SHOW_COLLISION_ALERTS
+    DEFAULT_MODEL_PATH, ROAD_CLASSES, ROAD_CLASS_IDS, PROGRESS_UPDATE_INTERVAL, USE_TENSORRT, 
+    CONFIDENCE_THRESHOLD, DEPTH_FRAME_STRIDE, 
+    DEFAULT_FOURCC, FALLBACK_FOURCC, DEFAULT_CAMERA_INDEX, DEFAULT_BATCH_SIZE, FRAME_QUEUE_SIZE, 
+    SHOW_DETECTIONS, SHOW_ROI, SHOW_WARNINGS, SHOW_COLLISION_ALERTS
 )
 
 
@@ -35,30 +40,124 @@ class RoadObjectDetector:
     visualization, and warning systems.
     """
     
-    def __init__(self, model_path: str = DEFAULT_MODEL_PATH):
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, use_tensorrt: bool = USE_TENSORRT,
+                 fast_depth: bool = False):
         """
         Initialize the detector with all required components.
         
         Args:
             model_path: Path to YOLO model weights
+            use_tensorrt: Use FP16 TensorRT engines for YOLO and MiDaS when available
+            fast_depth: Run MiDaS at the smaller MIDAS_INPUT_SIZE_FAST resolution
         """
-        # Initialize YOLO model
-        self.model = YOLO(model_path)
+        # Initialize YOLO model (on GPU with FP16 inference when available)
+        self.use_half = torch.cuda.is_available()
+        self.device = 0 if self.use_half else 'cpu'
+        self.model = None
+        if use_tensorrt and self.use_half:
+            self.model = self._load_yolo_engine(model_path)
+        yolo_engine_loaded = self.model is not None
+        if self.model is None:
+            self.model = YOLO(model_path)
+            if self.use_half:
+                self.model.to('cuda')
         self.class_names = self.model.names
         
+        # Dedicated CUDA stream for inference so uploads and kernels can overlap
+        # with the frame reader/writer threads
+        self.stream = torch.cuda.Stream() if torch.cuda.is_available() else None
+        
+        # Second stream so MiDaS can run concurrently with YOLO on the same frame
+        self.stream_depth = torch.cuda.Stream() if torch.cuda.is_available() else None
+        
+        # Road-specific object classes
+        self.road_classes = ROAD_CLASSES
+        self.road_class_ids = ROAD_CLASS_IDS
+        self.road_class_tensor = torch.tensor(sorted(ROAD_CLASS_IDS), 
+                                              device='cuda' if self.use_half else 'cpu')
+        
         # Initialize components
-        self.depth_estimator = DepthEstimator()
+        self.depth_estimator = DepthEstimator(use_tensorrt=use_tensorrt, fast_depth=fast_depth)
         self.roi_manager = ROIManager()
-        self.visualizer = Visualizer()
+        self.visualizer = Visualizer(road_class_ids=self.road_class_ids)
         self.warning_system = WarningSystem()
         
-        # Road-specific object classes
-        self.road_classes = ROAD_CLASSES
+        # TensorRT engines are built for a fixed batch of 1
+        self.max_batch_size = None
+        if yolo_engine_loaded or self.depth_estimator.trt_engine is not None:
+            self.max_batch_size = 1
+        
+        # Display flags, snapshotted once instead of read from settings every frame
+        self.set_display_flags(SHOW_DETECTIONS, SHOW_ROI, SHOW_WARNINGS, SHOW_COLLISION_ALERTS)
+        
+        # Depth changes slowly between frames, so MiDaS only runs every
+        # _depth_stride frames and the last map is reused in between
+        self._depth_stride = DEPTH_FRAME_STRIDE
+        self._last_depth = None
+        self._last_depth_index = 0
+        self._frame_index = 0
+        self._had_road_objects = False
+        
+        # Pay one-time CUDA/cuDNN setup costs now rather than on the first frame
+        self._warm_up()
         
         print("AVPSS Road Object Detector initialized successfully!")
     
+    def _warm_up(self):
+        """
+        Run YOLO and MiDaS once on a blank frame so that kernel selection,
+        library handle creation and compilation happen at startup.
+        """
+        dummy = np.zeros((480, 640, 3), dtype=np.uint8)
+        try:
+            with self._stream_context():
+                self.model(dummy, verbose=False, half=self.use_half, device=self.device)
+                self.depth_estimator.get_depth_map(dummy)
+            if self.stream is not None:
+                torch.cuda.synchronize()
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+    
+    def set_display_flags(self, show_detections: bool, show_roi: bool, 
+                          show_warnings: bool, show_collision_alerts: bool):
+        """
+        Set which overlays are drawn on processed frames.
+        
+        Args:
+            show_detections: Draw bounding boxes and labels
+            show_roi: Draw the collision ROI overlay
+            show_warnings: Draw left/right approach warnings
+            show_collision_alerts: Draw collision alerts
+        """
+        self._show_det = show_detections
+        self._show_roi = show_roi
+        self._show_warn = show_warnings
+        self._show_coll = show_collision_alerts
+    
+    def _load_yolo_engine(self, model_path: str):
+        """
+        Load a TensorRT engine for the YOLO model, exporting it next to the
+        weights on first use.
+        
+        Args:
+            model_path: Path to YOLO model weights
+            
+        Returns:
+            YOLO model backed by the engine, or None if export/loading fails
+        """
+        engine_path = Path(model_path).with_suffix('.engine')
+        try:
+            if not engine_path.exists():
+                print(f"Exporting TensorRT engine {engine_path} (one-time)...")
+                engine_path = YOLO(model_path).export(format='engine', half=True, imgsz=640, dynamic=False)
+            return YOLO(str(engine_path), task='detect')
+        except Exception as e:
+            print(f"Could not load TensorRT engine, using PyTorch YOLO: {e}")
+            return None
+    
     def detect_from_video(self, video_path: str, output_path: str = None, 
-                         display: bool = True, use_depth: bool = True):
+                         display: bool = True, use_depth: bool = True,
+                         batch_size: int = DEFAULT_BATCH_SIZE):
         """
         Detect objects in a video file.
         
@@ -67,11 +166,15 @@ class RoadObjectDetector:
             output_path: Path to save output video (optional)
             display: Whether to display video during processing
             use_depth: Whether to use depth estimation
+            batch_size: Frames per inference batch (ignored when displaying)
         """
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
-        cap = cv2.VideoCapture(video_path)
+        # Prefer the FFmpeg backend, falling back to OpenCV's default choice
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(video_path)
         
         # Get video properties
         fps = int(cap.get(cv2.CAP_PROP_FPS))
@@ -83,38 +186,72 @@ class RoadObjectDetector:
         if output_path:
             fourcc = cv2.VideoWriter_fourcc(*DEFAULT_FOURCC)
             out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            if not out.isOpened():
+                fourcc = cv2.VideoWriter_fourcc(*FALLBACK_FOURCC)
+                out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
         
         print(f"Processing video: {video_path}")
         print(f"Resolution: {width}x{height}, FPS: {fps}")
         
+        # Batching only pays off for offline processing; keep per-frame
+        # latency when the video is shown interactively
+        if display:
+            batch_size = 1
+        if self.max_batch_size is not None:
+            batch_size = min(batch_size, self.max_batch_size)
+        
+        # Set up the display window once
+        if display:
+            window_title = self.visualizer.create_window('AVPSS - Road Object Detection', use_depth)
+            cv2.namedWindow(window_title, cv2.WINDOW_NORMAL)
+        
+        # Decode and encode on background threads so they overlap with inference
+        stop_event = threading.Event()
+        frame_q, reader_thread = self._start_reader(cap, stop_event, FRAME_QUEUE_SIZE)
+        out_q, writer_thread = (None, None)
+        if out:
+            out_q, writer_thread = self._start_writer(out)
+        
         frame_count = 0
         start_time = cv2.getTickCount()
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process frame
-            annotated_frame = self._process_frame(frame, use_depth)
+        frames = []
+        stopped = False
+        
+        while not stopped:
+            frame = frame_q.get()
+            ret = frame is not None
+            if ret:
+                frames.append(frame)
             
-            # Save frame if output is specified
-            if out:
-                out.write(annotated_frame)
-            
-            # Display frame
-            if display:
-                window_title = self.visualizer.create_window('AVPSS - Road Object Detection', use_depth)
-                cv2.imshow(window_title, annotated_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+            if frames and (not ret or len(frames) == batch_size):
+                # Process frames
+                if len(frames) == 1:
+                    annotated_frames = [self._process_frame(frames[0], use_depth)]
+                else:
+                    annotated_frames = self._process_batch(frames, use_depth)
+                frames = []
+                
+                for annotated_frame in annotated_frames:
+                    # Save frame if output is specified
+                    if out_q:
+                        out_q.put(annotated_frame)
+                    
+                    # Display frame
+                    if display:
+                        cv2.imshow(window_title, annotated_frame)
+                        if cv2.waitKey(1) & 0xFF == ord('q'):
+                            stopped = True
+                            break
+                    
+                    frame_count += 1
+                    if frame_count % PROGRESS_UPDATE_INTERVAL == 0:
+                        current_time = cv2.getTickCount()
+                        elapsed_time = (current_time - start_time) / cv2.getTickFrequency()
+                        processing_fps = frame_count / elapsed_time
+                        print(f"Processed {frame_count} frames... Processing FPS: {processing_fps:.2f}")
             
-            frame_count += 1
-            if frame_count % PROGRESS_UPDATE_INTERVAL == 0:
-                current_time = cv2.getTickCount()
-                elapsed_time = (current_time - start_time) / cv2.getTickFrequency()
-                processing_fps = frame_count / elapsed_time
-                print(f"Processed {frame_count} frames... Processing FPS: {processing_fps:.2f}")
+            if not ret:
+                break
         
         # Calculate final processing FPS
         end_time = cv2.getTickCount()
@@ -122,6 +259,7 @@ class RoadObjectDetector:
         final_fps = frame_count / total_time
         
         # Cleanup
+        self._stop_threads(stop_event, reader_thread, out_q, writer_thread)
         cap.release()
         if out:
             out.release()
@@ -147,14 +285,26 @@ class RoadObjectDetector:
         if not cap.isOpened():
             raise RuntimeError(f"Could not open camera {camera_index}")
         
+        # Keep the driver queue to a single frame so reads return the latest image
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
         print(f"Starting real-time detection from camera {camera_index}")
         print("Press 'q' to quit, 's' to save current frame")
         
+        # Set up the display window once
+        if display:
+            window_title = self.visualizer.create_window('AVPSS - Real-time Road Object Detection', use_depth)
+            cv2.namedWindow(window_title, cv2.WINDOW_NORMAL)
+        
+        # Only keep the newest frame queued so latency does not build up
+        stop_event = threading.Event()
+        frame_q, reader_thread = self._start_reader(cap, stop_event, 1, drop_stale=True)
+        
         frame_count = 0
         
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            frame = frame_q.get()
+            if frame is None:
                 print("Failed to read from camera")
                 break
             
@@ -166,7 +316,6 @@ class RoadObjectDetector:
             
             # Display frame
             if display:
-                window_title = self.visualizer.create_window('AVPSS - Real-time Road Object Detection', use_depth)
                 cv2.imshow(window_title, annotated_frame)
                 
                 key = cv2.waitKey(1) & 0xFF
@@ -177,36 +326,275 @@ class RoadObjectDetector:
                     filename = f"detection_frame_{frame_count}.jpg"
                     if self.visualizer.save_frame(annotated_frame, filename):
                         print(f"Frame saved as: {filename}")
+                    else:
+                        print(f"Error saving frame: {filename}")
             
             frame_count += 1
         
         # Cleanup
+        self._stop_threads(stop_event, reader_thread)
         cap.release()
         cv2.destroyAllWindows()
         print("Camera detection stopped.")
     
-    def _process_frame(self, frame: np.ndarray, use_depth: bool = True) -> np.ndarray:
+    @staticmethod
+    def _put(q: queue.Queue, item, stop_event: threading.Event):
         """
-        Process a single frame through the detection pipeline.
+        Put an item on a bounded queue, giving up once stop_event is set.
+        """
+        while not stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def _start_reader(self, cap: cv2.VideoCapture, stop_event: threading.Event, 
+                      maxsize: int, drop_stale: bool = False) -> tuple:
+        """
+        Start a producer thread that decodes frames into a bounded queue.
+        A None item marks the end of the stream.
+        
+        Args:
+            cap: Opened video capture
+            stop_event: Event used to stop the reader early
+            maxsize: Maximum number of queued frames
+            drop_stale: Grab but do not decode frames while the queue is full
+                        (for live sources where only the latest frame matters)
+            
+        Returns:
+            tuple: (frame_queue, reader_thread)
+        """
+        frame_q = queue.Queue(maxsize=maxsize)
+        
+        def reader():
+            while not stop_event.is_set():
+                if not cap.grab():
+                    break
+                if drop_stale and frame_q.full():
+                    # Inference is behind; discard this frame without decoding it
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                self._put(frame_q, frame, stop_event)
+            self._put(frame_q, None, stop_event)
+        
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+        return frame_q, thread
+    
+    def _start_writer(self, out: cv2.VideoWriter) -> tuple:
+        """
+        Start a consumer thread that encodes annotated frames from a queue.
+        A None item stops the writer.
+        
+        Args:
+            out: Opened video writer
+            
+        Returns:
+            tuple: (output_queue, writer_thread)
+        """
+        out_q = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+        
+        def writer():
+            while True:
+                frame = out_q.get()
+                if frame is None:
+                    break
+                out.write(frame)
+        
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+        return out_q, thread
+    
+    def _stop_threads(self, stop_event: threading.Event, reader_thread: threading.Thread,
+                      out_q: queue.Queue = None, writer_thread: threading.Thread = None):
+        """
+        Flush the writer, stop the reader and wait for outstanding GPU work.
+        """
+        if writer_thread is not None:
+            out_q.put(None)
+            writer_thread.join()
+        
+        stop_event.set()
+        reader_thread.join()
+        
+        if self.stream is not None:
+            torch.cuda.synchronize()
+    
+    def _stream_context(self):
+        """
+        Return a context manager running enclosed CUDA work on the inference stream.
+        """
+        if self.stream is None:
+            return nullcontext()
+        return torch.cuda.stream(self.stream)
+    
+    def _road_mask(self, results) -> torch.Tensor:
+        """
+        Select confident road-class detections with a single tensor comparison.
+        
+        Args:
+            results: YOLO detection results for one frame
+            
+        Returns:
+            (N,) boolean tensor on the detection device
+        """
+        boxes = results[0].boxes
+        cls = boxes.cls.int()
+        is_road = (cls[:, None] == self.road_class_tensor[None, :]).any(-1)
+        return is_road & (boxes.conf > CONFIDENCE_THRESHOLD)
+    
+    def _get_depth(self, frame: np.ndarray):
+        """
+        Get the depth map for the frame, reusing the previous map for up to
+        _depth_stride - 1 frames.
         
         Args:
             frame: Input frame
+            
+        Returns:
+            depth_map: Depth map tensor on the depth estimator's device
+        """
+        if self._depth_due():
+            self._last_depth = self.depth_estimator.get_depth_map(frame)
+            self._last_depth_index = self._frame_index
+        return self._last_depth
+    
+    def _depth_due(self) -> bool:
+        """
+        Check whether the cached depth map is missing or older than _depth_stride frames.
+        """
+        return (self._last_depth is None or 
+                self._frame_index - self._last_depth_index >= self._depth_stride)
+    
+    def _process_batch(self, frames: list, use_depth: bool = True) -> list:
+        """
+        Run YOLO and MiDaS once over a batch of frames, then post-process
+        each frame through the regular per-frame pipeline. MiDaS only runs
+        on the frames that contain road objects.
+        
+        Args:
+            frames: List of same-sized input frames
+            use_depth: Whether to use depth estimation
+            
+        Returns:
+            List of annotated frames, in input order
+        """
+        with self._stream_context():
+            batch_results = self.model(frames, verbose=False, half=self.use_half, device=self.device)
+            
+            depth_maps = [None] * len(frames)
+            if use_depth:
+                needs_depth = [i for i, result in enumerate(batch_results) 
+                               if self._road_mask([result]).any()]
+                if needs_depth:
+                    batch_depth = self.depth_estimator.get_depth_map_batch(
+                        [frames[i] for i in needs_depth]
+                    )
+                    for i, depth_map in zip(needs_depth, batch_depth):
+                        depth_maps[i] = depth_map
+            
+            return [
+                self._process_frame(frame, use_depth, results=[result], depth_map=depth_map)
+                for frame, result, depth_map in zip(frames, batch_results, depth_maps)
+            ]
+    
+    def _process_frame(self, frame: np.ndarray, use_depth: bool = True, 
+                       results=None, depth_map=None, need_raw: bool = False) -> np.ndarray:
+        """
+        Process a single frame through the detection pipeline.
+        
+        Args:
+            frame: Input frame (annotated in place unless need_raw is set)
             use_depth: Whether to use depth estimation
+            results: Precomputed YOLO results for this frame (optional)
+            depth_map: Precomputed depth map tensor for this frame (optional)
+            need_raw: Keep frame untouched and annotate a copy instead
             
         Returns:
             Annotated frame with detections and warnings
         """
-        # Run YOLO detection
-        results = self.model(frame, verbose=False)
+        # YOLO and MiDaS both only read the frame, so when a fresh depth map is due
+        # and the previous frame had road objects (making it likely this one does
+        # too), launch MiDaS on its own stream first and let it overlap with YOLO
+        depth_launched = False
+        if (use_depth and depth_map is None and results is None and 
+                self.stream_depth is not None and self._had_road_objects and self._depth_due()):
+            with torch.cuda.stream(self.stream_depth):
+                depth_map = self._get_depth(frame)
+            depth_launched = True
+        
+        with self._stream_context():
+            # Run YOLO detection
+            if results is None:
+                results = self.model(frame, verbose=False, half=self.use_half, device=self.device)
+            
+            # Device-side join: sampling in analyze_frame waits for MiDaS without
+            # blocking the host
+            if depth_launched:
+                self.stream.wait_stream(self.stream_depth)
+                depth_map.record_stream(self.stream)
+        
+        annotated_frame, _, _, _ = self.analyze_frame(frame, results, depth_map, use_depth, need_raw, 
+                                                      depth_stride=True)
+        self._frame_index += 1
+        return annotated_frame
+    
+    def analyze_frame(self, frame: np.ndarray, results, depth_map=None, 
+                      use_depth: bool = True, need_raw: bool = False, 
+                      depth_stride: bool = False) -> tuple:
+        """
+        Run all post-processing for one frame in a single pass over its detections.
+        Boxes are filtered and extracted once and depth is sampled once; the
+        warning, collision and drawing logic all share the same medians.
         
-        # Get depth map for distance estimation if enabled
-        depth_map = None
-        if use_depth:
-            depth_map = self.depth_estimator.get_depth_map(frame)
+        Args:
+            frame: Input frame (annotated in place unless need_raw is set)
+            results: YOLO results for this frame
+            depth_map: Depth map for this frame, tensor or numpy array (optional;
+                       computed on demand when use_depth is set)
+            use_depth: Whether to use depth estimation
+            need_raw: Keep frame untouched and annotate a copy instead
+            depth_stride: Allow an on-demand depth map to come from the
+                          DEPTH_FRAME_STRIDE cache. Only the video pipeline sets
+                          this, since it advances the frame index; direct
+                          callers always get depth for the frame they pass.
+            
+        Returns:
+            tuple: (annotated_frame, collision_detected, left_close_vehicles, right_close_vehicles)
+        """
+        with self._stream_context():
+            # Filter to confident road-class boxes on the detection device
+            boxes = results[0].boxes
+            keep = self._road_mask(results)
+            road_xyxy = boxes.xyxy[keep]
+            self._had_road_objects = len(road_xyxy) > 0
+            
+            # Get depth map for distance estimation if enabled and any road object
+            # was found. The map stays on the device and all boxes are sampled in
+            # one pass; only the (N,) medians are copied back for the warning,
+            # ROI and drawing logic.
+            box_depths = None
+            if use_depth and len(road_xyxy) > 0:
+                if depth_map is None and depth_stride:
+                    depth_map = self._get_depth(frame)
+                elif depth_map is None:
+                    depth_map = self.depth_estimator.get_depth_map(frame)
+                elif not isinstance(depth_map, torch.Tensor):
+                    depth_map = torch.from_numpy(depth_map)
+                box_depths = self.depth_estimator.sample_boxes(
+                    depth_map, road_xyxy, frame_shape=frame.shape[:2]
+                ).cpu().numpy()
+            
+            road_class_ids = boxes.cls[keep].int().cpu().numpy()
+            road_xyxy = road_xyxy.cpu().numpy()
         
         # Get close vehicles for warning system
         left_close_vehicles, right_close_vehicles = self.warning_system.get_close_vehicles_by_side(
-            results, depth_map, frame.shape[1], self.class_names
+            road_xyxy, road_class_ids, None, frame.shape[1], frame.shape[0], self.class_names, 
+            medians=box_depths
         )
         
         # Update warning persistence
@@ -214,31 +602,36 @@ class RoadObjectDetector:
         
         # Check for collision alert in ROI
         collision_detected = False
-        if depth_map is not None:
+        if box_depths is not None:
             collision_detected = self.roi_manager.check_collision_alert(
-                frame, results, depth_map, frame.shape[1], frame.shape[0], self.class_names
+                road_xyxy, None, frame.shape[1], frame.shape[0], medians=box_depths
             )
         
         # Update collision alert persistence
         self.warning_system.update_collision_persistence(collision_detected)
         
-        # Start with original frame
-        annotated_frame = frame.copy()
+        # Annotate the frame in place; the raw pixels are not needed afterwards
+        # (the writer thread only ever receives the annotated frame). Copying a
+        # full HD frame costs ~6MB of memory traffic, so only do it on request.
+        annotated_frame = frame.copy() if need_raw else frame
         
         # Draw detections with depth information (if enabled)
-        if SHOW_DETECTIONS:
-            annotated_frame = self.visualizer.draw_detections(frame, results, depth_map, self.class_names)
+        if self._show_det:
+            # Draw exactly the road boxes analysed above, reusing their depths
+            self.visualizer.draw_detections(annotated_frame, results, None, self.class_names,
+                                            medians=box_depths, in_place=True, 
+                                            keep_idx=keep.nonzero()[:, 0].cpu().numpy())
         
         # Draw ROI visualization (if enabled)
-        if SHOW_ROI:
+        if self._show_roi:
             self.visualizer.draw_roi(annotated_frame, frame.shape[1], frame.shape[0])
         
         # Draw warnings for close vehicles (if enabled)
-        if SHOW_WARNINGS:
+        if self._show_warn:
             self.warning_system.draw_warnings(annotated_frame, frame.shape[1], frame.shape[0])
         
         # Draw collision alert only if it persists for 2+ frames (if enabled)
-        if SHOW_COLLISION_ALERTS and self.warning_system.should_show_collision_alert():
+        if self._show_coll and self.warning_system.should_show_collision_alert():
             self.warning_system.draw_collision_alert(annotated_frame, frame.shape[1], frame.shape[0])
         
-        return annotated_frame
\ No newline at end of file
+        return annotated_frame, collision_detected, left_close_vehicles, right_close_vehicles
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+TensorRT inference module.
+Builds, caches and runs FP16 TensorRT engines for the PyTorch models.
+"""
+
+import os
+import shutil
+import subprocess
+import torch
+
+# TensorRT is optional; engines are only used when it is installed
+try:
+    import tensorrt as trt
+except ImportError:
+    trt = None
+
+from avpss.config.settings import TRT_CACHE_DIR
+
+
+def tensorrt_available() -> bool:
+    """
+    Check whether TensorRT engines can be built and run on this machine.
+    
+    Returns:
+        bool: True if TensorRT, trtexec and a CUDA device are available
+    """
+    return trt is not None and shutil.which('trtexec') is not None and torch.cuda.is_available()
+
+
+class TensorRTEngine:
+    """
+    Runs a single-input, single-output TensorRT engine with fixed shapes.
+    Input and output live in device buffers allocated once at load time.
+    """
+    
+    def __init__(self, engine_path: str):
+        """
+        Load a serialized TensorRT engine.
+        
+        Args:
+            engine_path: Path to the serialized engine file
+        """
+        self.logger = trt.Logger(trt.Logger.WARNING)
+        with open(engine_path, 'rb') as f:
+            self.engine = trt.Runtime(self.logger).deserialize_cuda_engine(f.read())
+        self.context = self.engine.create_execution_context()
+        
+        # Engines built from fixed-shape ONNX have exactly one input and one output
+        names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.input_name, self.output_name = names[0], names[1]
+        self.input = torch.empty(tuple(self.engine.get_tensor_shape(self.input_name)),
+                                 dtype=torch.float32, device='cuda')
+        self.output = torch.empty(tuple(self.engine.get_tensor_shape(self.output_name)),
+                                  dtype=torch.float32, device='cuda')
+        self.context.set_tensor_address(self.input_name, self.input.data_ptr())
+        self.context.set_tensor_address(self.output_name, self.output.data_ptr())
+    
+    def __call__(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Run the engine on the current CUDA stream.
+        
+        Args:
+            input_tensor: Input tensor matching the engine input shape
+        
+        Returns:
+            The engine output buffer (overwritten by the next call)
+        """
+        self.input.copy_(input_tensor)
+        self.context.execute_async_v3(torch.cuda.current_stream().cuda_stream)
+        return self.output
+    
+    @staticmethod
+    def build(model: torch.nn.Module, input_shape: tuple, engine_name: str) -> str:
+        """
+        Export a model to ONNX and build an FP16 engine with trtexec, unless
+        a cached engine already exists.
+        
+        Args:
+            model: FP32 PyTorch model on the CUDA device
+            input_shape: Fixed input shape, e.g. (1, 3, 384, 384)
+            engine_name: File name of the cached engine
+        
+        Returns:
+            str: Path to the serialized engine
+        """
+        cache_dir = os.path.expanduser(TRT_CACHE_DIR)
+        engine_path = os.path.join(cache_dir, engine_name)
+        if os.path.exists(engine_path):
+            return engine_path
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        onnx_path = os.path.splitext(engine_path)[0] + '.onnx'
+        
+        print(f"Building TensorRT engine {engine_path} (one-time)...")
+        dummy = torch.zeros(input_shape, device='cuda')
+        torch.onnx.export(model, dummy, onnx_path, input_names=['input'],
+                          output_names=['output'], opset_version=17)
+        subprocess.run(['trtexec', f'--onnx={onnx_path}', f'--saveEngine={engine_path}', '--fp16'],
+                       check=True, stdout=subprocess.DEVNULL)
+        
+        return engine_path
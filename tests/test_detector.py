@@ -3,7 +3,9 @@ Basic test structure for AVPSS detector.
 """
 
 import unittest
+from unittest.mock import patch
 import numpy as np
+import torch
 import sys
 import os
 
@@ -11,7 +13,9 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from avpss.models.detector import RoadObjectDetector
-from avpss.config.settings import ROAD_CLASSES, CONFIDENCE_THRESHOLD
+from avpss.config.settings import (
+    ROAD_CLASSES, CONFIDENCE_THRESHOLD, COLLISION_THRESHOLD, CLOSE_DEPTH_THRESHOLD
+)
 
 
 class TestRoadObjectDetector(unittest.TestCase):
@@ -56,6 +60,11 @@ class TestRoadObjectDetector(unittest.TestCase):
         # Test case: object outside ROI
         out_roi = self.detector.roi_manager.is_in_collision_roi(50, 100, 150, 200, 800, 600)
         self.assertIsInstance(out_roi, bool)
+        
+        # Test batch intersection agrees with the per-box check
+        boxes = np.array([[200, 400, 300, 500], [50, 100, 150, 200]], dtype=np.float32)
+        batch = self.detector.roi_manager.is_in_collision_roi_batch(boxes, 800, 600)
+        self.assertEqual(batch.tolist(), [in_roi, out_roi])
     
     def test_warning_system_initialization(self):
         """Test warning system initialization."""
@@ -63,6 +72,54 @@ class TestRoadObjectDetector(unittest.TestCase):
         self.assertEqual(self.detector.warning_system.right_warning_frames, 0)
         self.assertEqual(self.detector.warning_system.warning_threshold, 3)
     
+    def test_analyze_frame(self):
+        """Test single-pass frame analysis on an empty frame."""
+        test_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        results = self.detector.model(test_frame, verbose=False)
+        
+        annotated, collision, left, right = self.detector.analyze_frame(test_frame, results)
+        self.assertEqual(annotated.shape, test_frame.shape)
+        self.assertFalse(collision)
+        self.assertEqual(left, [])
+        self.assertEqual(right, [])
+    
+    def _synthetic_results(self, frame, boxes):
+        """Build YOLO results holding the given [x1, y1, x2, y2, conf, cls] rows."""
+        from ultralytics.engine.results import Results
+        
+        boxes = torch.tensor(boxes, dtype=torch.float32, device=self.detector.road_class_tensor.device)
+        return [Results(frame, path="synthetic.jpg", names=self.detector.class_names, boxes=boxes)]
+    
+    def test_analyze_frame_with_depth(self):
+        """Test collision and side warnings for known boxes and a known depth map."""
+        test_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        # A close car in the bottom-left ROI cell and a far truck on the right
+        results = self._synthetic_results(test_frame, [
+            [180, 340, 260, 420, 0.9, 2],
+            [500, 100, 600, 200, 0.9, 7],
+        ])
+        # Same size as the frame, so box coordinates map one-to-one
+        depth_map = np.zeros((480, 640), dtype=np.float32)
+        depth_map[300:460, 140:300] = 2 * max(COLLISION_THRESHOLD, CLOSE_DEPTH_THRESHOLD)
+        
+        _, collision, left, right = self.detector.analyze_frame(test_frame, results, depth_map)
+        self.assertTrue(collision)
+        self.assertEqual(left, [self.detector.class_names[2]])
+        self.assertEqual(right, [])
+    
+    def test_analyze_frame_computes_fresh_depth(self):
+        """Test that direct calls without a depth map never reuse a previous frame's depth."""
+        estimator = self.detector.depth_estimator
+        frames = [np.zeros((480, 640, 3), dtype=np.uint8), 
+                  np.full((480, 640, 3), 255, dtype=np.uint8)]
+        
+        with patch.object(estimator, 'get_depth_map', wraps=estimator.get_depth_map) as get_depth_map:
+            for frame in frames:
+                results = self._synthetic_results(frame, [[180, 340, 260, 420, 0.9, 2]])
+                self.detector.analyze_frame(frame, results)
+        
+        self.assertEqual(get_depth_map.call_count, len(frames))
+    
     def test_visualizer_functionality(self):
         """Test visualizer basic functionality."""
         # Create a test frame
@@ -83,6 +140,91 @@ class TestRoadObjectDetector(unittest.TestCase):
             self.fail(f"Frame saving failed: {e}")
 
 
+class TestROIManager(unittest.TestCase):
+    """
+    Test ROI geometry and intersection without loading the models.
+    """
+    
+    def test_roi_test_matches_drawn_bounds(self):
+        """Test that boxes just inside/outside the reported ROI bounds are classified consistently."""
+        from avpss.utils.roi_manager import ROIManager
+        
+        roi_manager = ROIManager()
+        for width, height in [(800, 600), (1000, 1000), (640, 500)]:
+            left, top, right, bottom = roi_manager.get_roi_coordinates(width, height)
+            mid_x = (left + right) // 2
+            boxes = np.array([
+                [mid_x, top - 50, mid_x + 1, top],          # ends on the first ROI row
+                [mid_x, top - 50, mid_x + 1, top - 1],      # ends just above the ROI
+                [right - 1, top, right + 10, bottom - 1],   # starts in the last ROI column
+                [right, top, right + 10, bottom - 1],       # starts just right of the ROI
+                [left - 10, top, left, bottom - 1],         # ends on the first ROI column
+                [left - 10, top, left - 1, bottom - 1],     # ends just left of the ROI
+            ], dtype=np.float32)
+            expected = [True, False, True, False, True, False]
+            
+            batch = roi_manager.is_in_collision_roi_batch(boxes, width, height)
+            self.assertEqual(batch.tolist(), expected)
+            for box, inside in zip(boxes, expected):
+                self.assertEqual(roi_manager.is_in_collision_roi(*box, width, height), inside)
+
+
+class TestDepthSampling(unittest.TestCase):
+    """
+    Test the median-depth kernels against np.median without loading the models.
+    """
+    
+    def setUp(self):
+        """Set up a random depth map and windows (center, expected bounds)."""
+        self.depth_map = np.random.default_rng(0).random((48, 64), dtype=np.float32) * 1000
+        self.half = 5
+        self.windows = [
+            ((30, 20), (15, 25, 25, 35)),   # interior, 5x5 samples
+            ((2, 20), (15, 25, 0, 7)),      # left border, 5x4 samples (even count)
+            ((-10, 1000), (42, 48, 0, 5)),  # outside the map, clamped to the corner
+        ]
+    
+    def _reference(self, y0, y1, x0, x1):
+        return float(np.median(self.depth_map[y0:y1:2, x0:x1:2]))
+    
+    def test_sample_median_depth(self):
+        """Test single-point sampling for interior, border and clamped windows."""
+        from avpss.utils.depth_sampling import sample_median_depth
+        
+        for (cx, cy), bounds in self.windows:
+            median = sample_median_depth(self.depth_map, cx, cy, self.half, 2)
+            self.assertAlmostEqual(float(median), self._reference(*bounds), places=3)
+    
+    def test_batch_median_depth(self):
+        """Test batched sampling, frame-coordinate scaling and empty input."""
+        from avpss.utils.depth_kernels import batch_median_depth
+        
+        expected = [self._reference(*bounds) for _, bounds in self.windows]
+        xyxy = np.array([[cx, cy, cx, cy] for (cx, cy), _ in self.windows], dtype=np.float32)
+        np.testing.assert_allclose(batch_median_depth(self.depth_map, xyxy, self.half), 
+                                   expected, rtol=1e-5)
+        
+        # Boxes given for a frame twice the map size land on the same windows
+        np.testing.assert_allclose(batch_median_depth(self.depth_map, xyxy * 2, self.half, 
+                                                      frame_shape=(96, 128)), 
+                                   expected, rtol=1e-5)
+        
+        empty = batch_median_depth(self.depth_map, np.zeros((0, 4), dtype=np.float32), self.half)
+        self.assertEqual(empty.shape, (0,))
+    
+    def test_sample_boxes(self):
+        """Test that the device sampling path matches the kernels at interior and border windows."""
+        from avpss.models.depth_estimator import DepthEstimator
+        
+        # sample_boxes does not touch the model, so skip loading it
+        estimator = DepthEstimator.__new__(DepthEstimator)
+        expected = [self._reference(*bounds) for _, bounds in self.windows]
+        xyxy = torch.tensor([[cx, cy, cx, cy] for (cx, cy), _ in self.windows], dtype=torch.float32)
+        
+        medians = estimator.sample_boxes(torch.from_numpy(self.depth_map), xyxy, self.half)
+        np.testing.assert_allclose(medians.numpy(), expected, rtol=1e-5)
+
+
 class TestConfiguration(unittest.TestCase):
     """
     Test configuration settings.
@@ -0,0 +1,52 @@
+"""
+Depth sampling kernels.
+Computes the median depth around many points in one call, JIT-compiled
+with Numba when it is installed (see avpss.utils.depth_sampling).
+"""
+
+import numpy as np
+
+from avpss.utils.depth_sampling import frame_to_depth_scale, jit, prange, window_median
+
+
+@jit(parallel=True, fastmath=True)
+def _batch_median_depth(depth_map, y0, y1, x0, x1, stride):
+    count = y0.shape[0]
+    medians = np.empty(count, dtype=np.float32)
+    for i in prange(count):
+        medians[i] = window_median(depth_map, y0[i], y1[i], x0[i], x1[i], stride)
+    return medians
+
+
+def batch_median_depth(depth_map: np.ndarray, xyxy: np.ndarray, half: int,
+                       stride: int = 2, frame_shape: tuple = None) -> np.ndarray:
+    """
+    Get the median depth in a strided window around the center of every box.
+    
+    Args:
+        depth_map: 2-D depth map
+        xyxy: (N, 4) bounding boxes in frame coordinates
+        half: Half-size of the sampling window (depth map pixels)
+        stride: Step between samples in both directions
+        frame_shape: (height, width) of the frame the boxes refer to; None if the
+                     boxes are already in depth map coordinates
+    
+    Returns:
+        medians: (N,) float32 array of median depth values
+    """
+    depth_map = np.ascontiguousarray(depth_map, dtype=np.float32)
+    height, width = depth_map.shape
+    
+    # Map the boxes into depth map space
+    sx, sy = frame_to_depth_scale(depth_map.shape, frame_shape)
+    xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4) * (sx, sy, sx, sy)
+    
+    # Clamp the centers into the map (so no window is empty) and the window
+    # extents to the map edges once, for all boxes
+    centers = ((xyxy[:, :2] + xyxy[:, 2:]) / 2).astype(np.int64)
+    cx = np.clip(centers[:, 0], 0, width - 1)
+    cy = np.clip(centers[:, 1], 0, height - 1)
+    x0, x1 = np.clip(cx - half, 0, width), np.clip(cx + half, 0, width)
+    y0, y1 = np.clip(cy - half, 0, height), np.clip(cy + half, 0, height)
+    
+    return _batch_median_depth(depth_map, y0, y1, x0, x1, stride)
@@ -0,0 +1,103 @@
+"""
+Depth sampling module.
+Single definition of the strided median-depth window used by the depth
+estimator, the ROI manager, the warning system and the visualizer, and of
+the mapping from frame coordinates into depth map coordinates.
+
+Coordinate contract: the depth map is at MiDaS resolution, not frame
+resolution. Every public sampling entry point (DepthEstimator.sample_boxes,
+get_depth_at_location, estimate_distance, batch_median_depth and the
+component fallbacks) takes boxes/points in frame coordinates together with
+the frame's (height, width) and scales them with frame_to_depth_scale.
+Passing no frame shape means the coordinates are already in depth map space.
+"""
+
+import numpy as np
+
+# Numba is optional; without it the helpers and kernels run as plain NumPy.
+# This is the only place the dependency is handled.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+prange = numba.prange if numba is not None else range
+
+
+def jit(**options):
+    """
+    Get a decorator that compiles with numba.njit when Numba is installed.
+    
+    Args:
+        **options: Extra numba.njit options (e.g. parallel, fastmath)
+    
+    Returns:
+        decorator: numba.njit(cache=True, **options), or identity without Numba
+    """
+    if numba is None:
+        return lambda func: func
+    return numba.njit(cache=True, **options)
+
+
+def frame_to_depth_scale(depth_shape: tuple, frame_shape: tuple = None) -> tuple:
+    """
+    Get the factors that map frame coordinates into depth map coordinates.
+    
+    Args:
+        depth_shape: (height, width) of the depth map
+        frame_shape: (height, width) of the frame, or None when coordinates are
+                     already in depth map space
+    
+    Returns:
+        tuple: (sx, sy) scale factors for x and y
+    """
+    if frame_shape is None:
+        return 1.0, 1.0
+    return depth_shape[1] / frame_shape[1], depth_shape[0] / frame_shape[0]
+
+
+@jit()
+def window_median(depth_map, y0, y1, x0, x1, stride=2):
+    """
+    Get the median of a strided window whose bounds are already clamped to the map.
+    
+    Args:
+        depth_map: 2-D depth map (numpy array)
+        y0, y1, x0, x1: Window bounds (half-open, non-empty)
+        stride: Step between samples in both directions
+    
+    Returns:
+        median_depth: Median depth value in the window
+    """
+    patch = depth_map[y0:y1:stride, x0:x1:stride]
+    
+    # Selection instead of np.median's general path; windows are small (at
+    # most half * half samples, e.g. 25 for DEPTH_COLLISION_SAMPLE_SIZE and 100
+    # for DEPTH_SAMPLE_SIZE). For even sizes the two middle values are
+    # averaged, as np.median does.
+    values = np.partition(patch.flatten(), patch.size // 2)
+    k = values.size // 2
+    if values.size % 2 == 1:
+        return values[k]
+    return 0.5 * (values[k] + np.max(values[:k]))
+
+
+@jit()
+def sample_median_depth(depth_map, cx, cy, half=5, stride=2):
+    """
+    Get the median depth in a strided window around a point.
+    
+    Args:
+        depth_map: 2-D depth map (numpy array)
+        cx, cy: Center coordinates in depth map space, clamped into the map so the window is never empty
+        half: Half-size of the sampling window
+        stride: Step between samples in both directions
+    
+    Returns:
+        median_depth: Median depth value in the window
+    """
+    height, width = depth_map.shape[0], depth_map.shape[1]
+    cx = min(max(cx, 0), width - 1)
+    cy = min(max(cy, 0), height - 1)
+    return window_median(depth_map, max(0, cy - half), min(height, cy + half),
+                         max(0, cx - half), min(width, cx + half), stride)
@@ -3,12 +3,59 @@ ROI (Region of Interest) management module.
 Handles collision detection and ROI calculations.
 """
 
+from functools import lru_cache
+
 import numpy as np
+from avpss.utils.depth_kernels import batch_median_depth
 from avpss.config.settings import (
-    GRID_COLS, GRID_ROWS, ROI_GRID_POSITIONS, COLLISION_THRESHOLD,
-    CONFIDENCE_THRESHOLD, ROAD_CLASSES, DEPTH_COLLISION_SAMPLE_SIZE
+    GRID_COLS, GRID_ROWS, ROI_CELLS, COLLISION_THRESHOLD, DEPTH_COLLISION_SAMPLE_SIZE
 )
 
+# Grid cells belonging to the collision ROI, plus its summed-area table so
+# "does a cell range contain any ROI cell" is four lookups for any ROI shape
+ROI_CELL_MASK = np.zeros((GRID_ROWS, GRID_COLS), dtype=bool)
+ROI_CELL_MASK[tuple(np.array(ROI_CELLS).T)] = True
+ROI_CELL_SAT = np.pad(ROI_CELL_MASK.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+
+
+@lru_cache(maxsize=8)
+def roi_geometry(frame_width: int, frame_height: int) -> tuple:
+    """
+    Get the grid cell size and collision ROI bounds for a frame size. Frame size
+    is fixed per video, so this is computed once and shared by the ROI manager
+    and the visualizer.
+    
+    Args:
+        frame_width: Width of the frame
+        frame_height: Height of the frame
+        
+    Returns:
+        tuple: (grid_width, grid_height, roi_bounds, cell_rects) where roi_bounds is
+               (roi_left, roi_top, roi_right, roi_bottom) around all ROI cells and
+               cell_rects holds the same kind of bounds for each cell in ROI_CELLS.
+               All bounds are half-open: x in [left, right), y in [top, bottom).
+    """
+    # Calculate grid dimensions
+    grid_width = frame_width // GRID_COLS
+    grid_height = frame_height // GRID_ROWS
+    
+    # Pixel bounds of each ROI cell. Cell (row, col) starts at (col * grid_width,
+    # row * grid_height); the last row/column also takes the leftover pixels so
+    # the grid covers the whole frame. These are exactly the cells the ROI tests
+    # map box corners to.
+    cell_rects = []
+    for row, col in ROI_CELLS:
+        left = col * grid_width
+        right = frame_width if col == GRID_COLS - 1 else (col + 1) * grid_width
+        top = row * grid_height
+        bottom = frame_height if row == GRID_ROWS - 1 else (row + 1) * grid_height
+        cell_rects.append((left, top, right, bottom))
+    
+    roi_bounds = (min(rect[0] for rect in cell_rects), min(rect[1] for rect in cell_rects),
+                  max(rect[2] for rect in cell_rects), max(rect[3] for rect in cell_rects))
+    
+    return grid_width, grid_height, roi_bounds, tuple(cell_rects)
+
 
 class ROIManager:
     """
@@ -23,7 +70,11 @@ class ROIManager:
                            frame_width: int, frame_height: int) -> bool:
         """
         Check if a vehicle bounding box intersects with the collision ROI.
-        ROI is the two central squares of the bottom row: (2,2), (2,3), (4,2), (4,3)
+        ROI is the set of grid cells in ROI_CELLS (the two central squares of
+        the bottom row); the box corners are mapped to grid cells and the
+        covered cell range is looked up in ROI_CELL_MASK. The cells are the
+        same half-open pixel rectangles that roi_geometry reports and
+        Visualizer.draw_roi draws.
         
         Args:
             x1, y1, x2, y2: Bounding box coordinates
@@ -33,74 +84,80 @@ class ROIManager:
         Returns:
             bool: True if vehicle intersects with collision ROI
         """
-        # Calculate grid dimensions
-        grid_width = frame_width // GRID_COLS
-        grid_height = frame_height // GRID_ROWS
+        grid_width, grid_height = roi_geometry(frame_width, frame_height)[:2]
+        
+        # Grid cells covered by the box; leftover pixels past the last full
+        # cell belong to the last row/column
+        c0 = min(max(int(x1 // grid_width), 0), GRID_COLS - 1)
+        c1 = min(max(int(x2 // grid_width), 0), GRID_COLS - 1)
+        r0 = min(max(int(y1 // grid_height), 0), GRID_ROWS - 1)
+        r1 = min(max(int(y2 // grid_height), 0), GRID_ROWS - 1)
+        
+        # Check if any covered cell is part of the ROI
+        return bool(ROI_CELL_MASK[r0:r1 + 1, c0:c1 + 1].any())
+    
+    def is_in_collision_roi_batch(self, xyxy: np.ndarray, frame_width: int, 
+                                  frame_height: int) -> np.ndarray:
+        """
+        Vectorized is_in_collision_roi: test all bounding boxes against the
+        collision ROI in one pass.
         
-        # ROI is the two central squares of the bottom row
-        # Grid positions: (2,2), (2,3), (4,2), (4,3)
-        # This means columns 1-2 (0-indexed) of the bottom row
-        roi_top = frame_height - grid_height
-        roi_bottom = frame_height
-        roi_left = grid_width  # Start from column 1 (0-indexed)
-        roi_right = 3 * grid_width  # End at column 3 (0-indexed)
+        Args:
+            xyxy: (N, 4) bounding boxes
+            frame_width: Width of the frame
+            frame_height: Height of the frame
+            
+        Returns:
+            np.ndarray: (N,) bool mask, True where the box intersects the ROI
+        """
+        xyxy = np.asarray(xyxy).reshape(-1, 4)
+        grid_width, grid_height = roi_geometry(frame_width, frame_height)[:2]
+        
+        # Covered cell ranges for all boxes, as half-open [c0, c1) x [r0, r1)
+        c0 = np.clip(xyxy[:, 0] // grid_width, 0, GRID_COLS - 1).astype(np.intp)
+        c1 = np.clip(xyxy[:, 2] // grid_width, 0, GRID_COLS - 1).astype(np.intp) + 1
+        r0 = np.clip(xyxy[:, 1] // grid_height, 0, GRID_ROWS - 1).astype(np.intp)
+        r1 = np.clip(xyxy[:, 3] // grid_height, 0, GRID_ROWS - 1).astype(np.intp) + 1
         
-        # Check if bounding box intersects with ROI
-        return not (x2 < roi_left or x1 > roi_right or y2 < roi_top or y1 > roi_bottom)
+        # Number of ROI cells inside each range, from the summed-area table
+        count = ROI_CELL_SAT[r1, c1] - ROI_CELL_SAT[r0, c1] - ROI_CELL_SAT[r1, c0] + ROI_CELL_SAT[r0, c0]
+        return count > 0
     
-    def check_collision_alert(self, frame: np.ndarray, results, depth_map: np.ndarray, 
-                            frame_width: int, frame_height: int, class_names: dict) -> bool:
+    def check_collision_alert(self, xyxy: np.ndarray, depth_map: np.ndarray, 
+                            frame_width: int, frame_height: int, 
+                            medians: np.ndarray = None) -> bool:
         """
         Check for collision alert conditions in the ROI.
         
         Args:
-            frame: Input frame
-            results: YOLO detection results
-            depth_map: Depth map for distance estimation
+            xyxy: (N, 4) boxes of confident road-class detections (frame coordinates)
+            depth_map: Depth map for distance estimation; boxes are scaled from
+                       the frame size into it
             frame_width: Width of the frame
             frame_height: Height of the frame
-            class_names: Dictionary mapping class IDs to names
+            medians: Optional precomputed median depth per box (skips sampling)
             
         Returns:
             bool: True if collision alert should be shown
         """
-        collision_detected = False
+        # Check which vehicles are in the collision ROI, all at once
+        in_roi = self.is_in_collision_roi_batch(xyxy, frame_width, frame_height)
+        
+        if medians is not None:
+            return bool(np.any(in_roi & (np.asarray(medians) > COLLISION_THRESHOLD)))
         
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Get box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = class_names[class_id]
-                    
-                    # Only check road-relevant objects with good confidence
-                    if confidence > CONFIDENCE_THRESHOLD and class_id in ROAD_CLASSES.values():
-                        # Check if vehicle is in collision ROI
-                        if self.is_in_collision_roi(x1, y1, x2, y2, frame_width, frame_height):
-                            if depth_map is not None:
-                                # Get depth value at vehicle location
-                                center_x = int((x1 + x2) / 2)
-                                center_y = int((y1 + y2) / 2)
-                                
-                                # Sample depth values around center
-                                depth_values = []
-                                for dx in range(-DEPTH_COLLISION_SAMPLE_SIZE, DEPTH_COLLISION_SAMPLE_SIZE, 2):
-                                    for dy in range(-DEPTH_COLLISION_SAMPLE_SIZE, DEPTH_COLLISION_SAMPLE_SIZE, 2):
-                                        sample_x = max(0, min(depth_map.shape[1]-1, center_x + dx))
-                                        sample_y = max(0, min(depth_map.shape[0]-1, center_y + dy))
-                                        depth_values.append(depth_map[sample_y, sample_x])
-                                
-                                median_depth = np.median(depth_values)
-                                
-                                # Check collision condition
-                                if median_depth > COLLISION_THRESHOLD:
-                                    collision_detected = True
-                                    break
+        if depth_map is None:
+            return False
         
-        return collision_detected
+        # Sample depth only for the vehicles in the ROI, in one kernel call
+        candidates = np.nonzero(in_roi)[0]
+        if len(candidates) == 0:
+            return False
+        roi_medians = batch_median_depth(depth_map, xyxy[candidates], DEPTH_COLLISION_SAMPLE_SIZE, 
+                                         frame_shape=(frame_height, frame_width))
+        
+        # Check collision condition
+        return bool(np.any(roi_medians > COLLISION_THRESHOLD))
     
     def get_roi_coordinates(self, frame_width: int, frame_height: int) -> tuple:
         """
@@ -111,16 +168,7 @@ class ROIManager:
             frame_height: Height of the frame
             
         Returns:
-            tuple: (roi_left, roi_top, roi_right, roi_bottom)
+            tuple: (roi_left, roi_top, roi_right, roi_bottom) bounding all ROI cells,
+                   half-open (x in [roi_left, roi_right), y in [roi_top, roi_bottom))
         """
-        # Calculate grid dimensions
-        grid_width = frame_width // GRID_COLS
-        grid_height = frame_height // GRID_ROWS
-        
-        # ROI is the two central squares of the bottom row
-        roi_top = frame_height - grid_height
-        roi_bottom = frame_height
-        roi_left = grid_width  # Start from column 1 (0-indexed)
-        roi_right = 3 * grid_width  # End at column 3 (0-indexed)
-        
-        return roi_left, roi_top, roi_right, roi_bottom
+        return roi_geometry(frame_width, frame_height)[2]
@@ -5,115 +5,165 @@ Handles all drawing and display functionality.
 
 import cv2
 import numpy as np
+from avpss.utils.depth_kernels import batch_median_depth
+from avpss.utils.roi_manager import roi_geometry
 from avpss.config.settings import (
-    COLORS, FONT, CONFIDENCE_THRESHOLD, ROAD_CLASSES, GRID_COLS, GRID_ROWS, CLOSE_DEPTH_THRESHOLD
+    COLORS, FONT, CONFIDENCE_THRESHOLD, ROAD_CLASS_IDS, CLOSE_DEPTH_THRESHOLD
 )
 
 
+# Placeholders returned by _extract for frames without detections
+EMPTY_XYXY = np.empty((0, 4), dtype=np.float32)
+EMPTY_CONF = np.empty(0, dtype=np.float32)
+EMPTY_CLS = np.empty(0, dtype=np.int32)
+
+
+def _extract(results) -> tuple:
+    """
+    Copy box coordinates, confidences and class IDs of a single-frame YOLO
+    result to the host.
+    
+    Args:
+        results: YOLO detection results for one frame (ultralytics returns one Results per image)
+        
+    Returns:
+        tuple: (xyxy, confs, cls_ids) numpy arrays
+    """
+    boxes = results[0].boxes
+    if boxes is None or len(boxes) == 0:
+        return EMPTY_XYXY, EMPTY_CONF, EMPTY_CLS
+    return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(np.int32)
+
+
 class Visualizer:
     """
     Handles all visualization and drawing operations.
     """
     
-    def __init__(self):
-        """Initialize visualizer."""
-        pass
+    def __init__(self, road_class_ids: frozenset = ROAD_CLASS_IDS):
+        """
+        Initialize visualizer.
+        
+        Args:
+            road_class_ids: Set of class IDs that are drawn
+        """
+        self.road_class_ids = road_class_ids
+        self.road_id_array = np.array(sorted(road_class_ids), dtype=np.int32)
+        
+        # Solid ROI color tiles per cell shape, blended into the ROI cells only
+        self._roi_fills = {}
+        
+        # Output buffer reused by draw_detections when not drawing in place
+        self._annot_buf = None
     
     def draw_detections(self, frame: np.ndarray, results, depth_map: np.ndarray = None, 
-                       class_names: dict = None) -> np.ndarray:
+                       class_names: dict = None, medians: np.ndarray = None, 
+                       in_place: bool = False, keep_idx: np.ndarray = None) -> np.ndarray:
         """
         Draw bounding boxes and labels on the frame with depth information.
         
         Args:
             frame: Input frame
             results: YOLO detection results
-            depth_map: Optional depth map for distance estimation
+            depth_map: Optional depth map for distance estimation; boxes are scaled
+                       from the frame size into it
             class_names: Dictionary mapping class IDs to names
+            medians: Optional precomputed median depth per box (skips sampling);
+                     aligned with keep_idx when that is given
+            in_place: Draw directly on frame instead of on a copy
+            keep_idx: Optional indices of the boxes to draw, already filtered by
+                      confidence and class (skips filtering)
             
         Returns:
-            Annotated frame
+            Annotated frame. Unless in_place is set this is an internal buffer
+            that is overwritten by the next call, so copy it to keep it.
         """
-        annotated_frame = frame.copy()
+        if in_place:
+            annotated_frame = frame
+        else:
+            if (self._annot_buf is None or self._annot_buf.shape != frame.shape or 
+                    self._annot_buf.dtype != frame.dtype):
+                self._annot_buf = np.empty_like(frame)
+            np.copyto(self._annot_buf, frame)
+            annotated_frame = self._annot_buf
         
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Get box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = class_names[class_id] if class_names else f"class_{class_id}"
-                    
-                    # Only draw if confidence is above threshold and it's a road-relevant object
-                    if confidence > CONFIDENCE_THRESHOLD and class_id in ROAD_CLASSES.values():
-                        # Estimate distance if depth map is available
-                        distance_info = ""
-                        if depth_map is not None:
-                            # Simple distance estimation based on depth map
-                            center_x = int((x1 + x2) / 2)
-                            center_y = int((y1 + y2) / 2)
-                            
-                            # Sample depth values around center
-                            depth_values = []
-                            for dx in range(-5, 5, 2):
-                                for dy in range(-5, 5, 2):
-                                    sample_x = max(0, min(depth_map.shape[1]-1, center_x + dx))
-                                    sample_y = max(0, min(depth_map.shape[0]-1, center_y + dy))
-                                    depth_values.append(depth_map[sample_y, sample_x])
-                            
-                            median_depth = np.median(depth_values)
-                            if median_depth > CLOSE_DEPTH_THRESHOLD:
-                                distance_info = f" | Close ({median_depth:.2f})"
-                            else:
-                                distance_info = f" | Normal ({median_depth:.2f})"
-                        
-                        # Determine color based on object type
-                        if class_name in ['truck', 'bus']:
-                            color = COLORS['truck_bus']
-                        elif class_name in [ 'motorcycle']:
-                            color = COLORS['motorcycle']
-                        elif class_name in ['person']:
-                            color = COLORS['person']
-                        else:
-                            color = COLORS['default']
-                        
-                        # Draw bounding box
-                        cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
-                        
-                        # Draw label with confidence and distance
-                        label = f"{class_name}: {confidence:.2f}{distance_info}"
-                        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-                        cv2.rectangle(annotated_frame, (int(x1), int(y1) - label_size[1] - 10), 
-                                    (int(x1) + label_size[0], int(y1)), color, -1)
-                        cv2.putText(annotated_frame, label, (int(x1), int(y1) - 5), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+        # Copy each field to the host once for all boxes instead of per box
+        xyxy, confs, cls_ids = _extract(results)
+        
+        # Only draw if confidence is above threshold and it's a road-relevant object.
+        # box_medians is aligned with indices.
+        if keep_idx is None:
+            keep = (confs > CONFIDENCE_THRESHOLD) & np.isin(cls_ids, self.road_id_array)
+            indices = np.nonzero(keep)[0]
+            box_medians = medians[indices] if medians is not None else None
+        else:
+            indices = np.asarray(keep_idx)
+            box_medians = medians
+        
+        # Simple distance estimation based on depth map, one kernel call for all boxes
+        if box_medians is None and depth_map is not None and len(indices) > 0:
+            box_medians = batch_median_depth(depth_map, xyxy[indices], 5, frame_shape=frame.shape[:2])
+        
+        for j, i in enumerate(indices):
+            x1, y1, x2, y2 = xyxy[i]
+            confidence = confs[i]
+            class_id = int(cls_ids[i])
+            class_name = class_names[class_id] if class_names else f"class_{class_id}"
+            
+            # Estimate distance if depth map is available
+            distance_info = ""
+            median_depth = None
+            if box_medians is not None:
+                median_depth = box_medians[j]
+            
+            if median_depth is not None:
+                if median_depth > CLOSE_DEPTH_THRESHOLD:
+                    distance_info = f" | Close ({median_depth:.2f})"
+                else:
+                    distance_info = f" | Normal ({median_depth:.2f})"
+            
+            # Determine color based on object type
+            if class_name in ['truck', 'bus']:
+                color = COLORS['truck_bus']
+            elif class_name in [ 'motorcycle']:
+                color = COLORS['motorcycle']
+            elif class_name in ['person']:
+                color = COLORS['person']
+            else:
+                color = COLORS['default']
+            
+            # Draw bounding box
+            cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+            
+            # Draw label with confidence and distance
+            label = f"{class_name}: {confidence:.2f}{distance_info}"
+            label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
+            cv2.rectangle(annotated_frame, (int(x1), int(y1) - label_size[1] - 10), 
+                        (int(x1) + label_size[0], int(y1)), color, -1)
+            cv2.putText(annotated_frame, label, (int(x1), int(y1) - 5), 
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
         
         return annotated_frame
     
     def draw_roi(self, frame: np.ndarray, frame_width: int, frame_height: int):
         """
-        Draw the collision ROI visualization (two central squares of bottom row).
+        Draw the collision ROI visualization (the grid cells in ROI_CELLS).
         
         Args:
             frame: Frame to draw on
             frame_width: Width of the frame
             frame_height: Height of the frame
         """
-        # Calculate grid dimensions
-        grid_width = frame_width // GRID_COLS
-        grid_height = frame_height // GRID_ROWS
-        
-        # ROI is the two central squares of the bottom row
-        roi_top = frame_height - grid_height
-        roi_bottom = frame_height
-        roi_left = grid_width  # Start from column 1 (0-indexed)
-        roi_right = 3 * grid_width  # End at column 3 (0-indexed)
-        
-        # Draw ROI rectangle with semi-transparent overlay
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (roi_left, roi_top), (roi_right, roi_bottom), COLORS['roi_overlay'], -1)
-        cv2.addWeighted(overlay, 0.1, frame, 0.9, 0, frame)  # Semi-transparent
+        # Draw each ROI cell with a semi-transparent overlay, blending only the
+        # pixels the cell covers instead of a whole frame copy
+        for left, top, right, bottom in roi_geometry(frame_width, frame_height)[3]:
+            region = frame[top:bottom, left:right]
+            fill = self._roi_fills.get(region.shape)
+            if fill is None:
+                fill = np.empty_like(region)
+                fill[:] = COLORS['roi_overlay']
+                self._roi_fills[region.shape] = fill
+            cv2.addWeighted(fill, 0.1, region, 0.9, 0, dst=region)  # Semi-transparent
     
     def draw_frame_counter(self, frame: np.ndarray, frame_count: int):
         """
@@ -162,11 +212,9 @@ class Visualizer:
             filename: Output filename
             
         Returns:
-            bool: True if successful
+            bool: True if the image was written
         """
-        try:
-            cv2.imwrite(filename, frame)
-            return True
-        except Exception as e:
-            print(f"Error saving frame: {e}")
-            return False
+        # imwrite copies non-contiguous views internally; hand it a contiguous array
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        return bool(cv2.imwrite(filename, frame))
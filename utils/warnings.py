@@ -5,8 +5,9 @@ Handles warning persistence and display logic.
 
 import cv2
 import numpy as np
+from avpss.utils.depth_kernels import batch_median_depth
 from avpss.config.settings import (
-    WARNING_THRESHOLD, COLORS, FONT, CONFIDENCE_THRESHOLD, ROAD_CLASSES, COLLISION_ALERT_THRESHOLD, CLOSE_DEPTH_THRESHOLD
+    WARNING_THRESHOLD, COLORS, FONT, COLLISION_ALERT_THRESHOLD, CLOSE_DEPTH_THRESHOLD
 )
 
 
@@ -16,6 +17,16 @@ class WarningSystem:
     Tracks warning persistence and provides warning display functionality.
     """
     
+    # Static warning and alert messages
+    LEFT_TEXT = "LEFT APPROACH DETECTED"
+    RIGHT_TEXT = "RIGHT APPROACH DETECTED"
+    ALERT_TEXT = "COLLISION ALERT"
+    
+    # Collision alert font settings (independent of the FONT config)
+    ALERT_FONT = cv2.FONT_HERSHEY_SIMPLEX
+    ALERT_FONT_SCALE = 1.0
+    ALERT_FONT_THICKNESS = 2
+    
     def __init__(self):
         """Initialize warning system."""
         # Warning persistence tracking
@@ -26,6 +37,23 @@ class WarningSystem:
         # Collision alert persistence tracking
         self.collision_alert_frames = 0
         self.collision_alert_threshold = COLLISION_ALERT_THRESHOLD
+        
+        # Alert layout per (frame_width, frame_height): solid background tile
+        # and box/text coordinates, blended into the alert box only
+        self._alert_cache = {}
+        
+        # Warning font settings, resolved once
+        self._font = getattr(cv2, FONT['family'])
+        self._font_scale = FONT['scale']
+        self._font_thickness = FONT['thickness']
+        
+        # Text sizes of the static messages never change, so measure them once
+        self._left_text_size = cv2.getTextSize(self.LEFT_TEXT, self._font, self._font_scale, 
+                                               self._font_thickness)[0]
+        self._right_text_size = cv2.getTextSize(self.RIGHT_TEXT, self._font, self._font_scale, 
+                                                self._font_thickness)[0]
+        self._alert_text_size = cv2.getTextSize(self.ALERT_TEXT, self.ALERT_FONT, self.ALERT_FONT_SCALE, 
+                                                self.ALERT_FONT_THICKNESS)[0]
     
     def update_warning_persistence(self, left_close_vehicles: list, right_close_vehicles: list):
         """
@@ -81,14 +109,14 @@ class WarningSystem:
         # Warning colors and settings
         warning_color = COLORS['warning']
         warning_bg_color = COLORS['warning_bg']
-        font = getattr(cv2, FONT['family'])
-        font_scale = FONT['scale']
-        thickness = FONT['thickness']
+        font = self._font
+        font_scale = self._font_scale
+        thickness = self._font_thickness
         
         # Left side warning (only if persistent for 3+ frames)
         if self.left_warning_frames >= self.warning_threshold:
-            left_text = "LEFT APPROACH DETECTED"
-            left_text_size = cv2.getTextSize(left_text, font, font_scale, thickness)[0]
+            left_text = self.LEFT_TEXT
+            left_text_size = self._left_text_size
             
             # Position on left side, middle height
             left_x = 20
@@ -103,8 +131,8 @@ class WarningSystem:
         
         # Right side warning (only if persistent for 3+ frames)
         if self.right_warning_frames >= self.warning_threshold:
-            right_text = "RIGHT APPROACH DETECTED"
-            right_text_size = cv2.getTextSize(right_text, font, font_scale, thickness)[0]
+            right_text = self.RIGHT_TEXT
+            right_text_size = self._right_text_size
             
             # Position on right side, middle height
             right_x = frame_width - right_text_size[0] - 20
@@ -127,7 +155,7 @@ class WarningSystem:
             frame_height: Height of the frame
         """
         # Minimalistic alert design
-        alert_text = "COLLISION ALERT"
+        alert_text = self.ALERT_TEXT
         
         # Clean colors (BGR format)
         text_color = (255, 255, 255)     # White text
@@ -136,28 +164,40 @@ class WarningSystem:
         alpha = 0.5                      # Transparency level
         
         # Font settings
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 1.0
-        thickness = 2
-        
-        # Get text size
-        text_size = cv2.getTextSize(alert_text, font, font_scale, thickness)[0]
-        
-        # Center positioning
-        text_x = (frame_width - text_size[0]) // 2
-        text_y = (frame_height + text_size[1]) // 2
-        
-        # Create minimal background rectangle
-        padding = 20
-        rect_top = text_y - text_size[1] - padding
-        rect_bottom = text_y + padding
-        rect_left = text_x - padding
-        rect_right = text_x + text_size[0] + padding
+        font = self.ALERT_FONT
+        font_scale = self.ALERT_FONT_SCALE
+        thickness = self.ALERT_FONT_THICKNESS
+        
+        # The layout only depends on the frame size, so compute it once per size
+        layout = self._alert_cache.get((frame_width, frame_height))
+        if layout is None:
+            # Get text size (measured once at init)
+            text_size = self._alert_text_size
+            
+            # Center positioning
+            text_x = (frame_width - text_size[0]) // 2
+            text_y = (frame_height + text_size[1]) // 2
+            
+            # Create minimal background rectangle
+            padding = 20
+            rect_top = text_y - text_size[1] - padding
+            rect_bottom = text_y + padding
+            rect_left = text_x - padding
+            rect_right = text_x + text_size[0] + padding
+            
+            # Background tile matching the (frame-clipped) box region
+            tile_height = min(rect_bottom + 1, frame_height) - max(0, rect_top)
+            tile_width = min(rect_right + 1, frame_width) - max(0, rect_left)
+            tile = np.empty((max(tile_height, 0), max(tile_width, 0)) + frame.shape[2:], dtype=frame.dtype)
+            tile[:] = bg_color
+            
+            layout = (tile, text_x, text_y, rect_top, rect_bottom, rect_left, rect_right)
+            self._alert_cache[(frame_width, frame_height)] = layout
+        tile, text_x, text_y, rect_top, rect_bottom, rect_left, rect_right = layout
         
-        # Draw transparent background
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (rect_left, rect_top), (rect_right, rect_bottom), bg_color, -1)
-        cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+        # Draw transparent background, blending only the alert box region
+        region = frame[max(0, rect_top):rect_bottom + 1, max(0, rect_left):rect_right + 1]
+        cv2.addWeighted(tile, alpha, region, 1 - alpha, 0, dst=region)
         
         # Draw simple border
         cv2.rectangle(frame, (rect_left, rect_top), (rect_right, rect_bottom), border_color, 2)
@@ -165,58 +205,39 @@ class WarningSystem:
         # Draw clean text
         cv2.putText(frame, alert_text, (text_x, text_y), font, font_scale, text_color, thickness)
     
-    def get_close_vehicles_by_side(self, results, depth_map: np.ndarray, frame_width: int, 
-                                 class_names: dict) -> tuple:
+    def get_close_vehicles_by_side(self, xyxy: np.ndarray, class_ids: np.ndarray, 
+                                 depth_map: np.ndarray, frame_width: int, frame_height: int, 
+                                 class_names: dict, medians: np.ndarray = None) -> tuple:
         """
         Analyze detections and return close vehicles on left and right sides.
         
         Args:
-            results: YOLO detection results
-            depth_map: Depth map for distance estimation
+            xyxy: (N, 4) boxes of confident road-class detections (frame coordinates)
+            class_ids: (N,) class IDs of those detections
+            depth_map: Depth map for distance estimation; boxes are scaled from
+                       the frame size into it
             frame_width: Width of the frame
+            frame_height: Height of the frame
             class_names: Dictionary mapping class IDs to names
+            medians: Optional precomputed median depth per box (skips sampling)
             
         Returns:
             tuple: (left_close_vehicles, right_close_vehicles)
         """
-        left_close_vehicles = []
-        right_close_vehicles = []
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Get box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = class_names[class_id]
-                    
-                    # Only check road-relevant objects with good confidence
-                    if confidence > CONFIDENCE_THRESHOLD and class_id in ROAD_CLASSES.values():
-                        # Check if close using depth map
-                        is_close = False
-                        if depth_map is not None:
-                            center_x = int((x1 + x2) / 2)
-                            center_y = int((y1 + y2) / 2)
-                            
-                            # Sample depth values around center
-                            depth_values = []
-                            for dx in range(-5, 5, 2):
-                                for dy in range(-5, 5, 2):
-                                    sample_x = max(0, min(depth_map.shape[1]-1, center_x + dx))
-                                    sample_y = max(0, min(depth_map.shape[0]-1, center_y + dy))
-                                    depth_values.append(depth_map[sample_y, sample_x])
-                            
-                            median_depth = np.median(depth_values)
-                            is_close = median_depth > CLOSE_DEPTH_THRESHOLD  # Close threshold
-                        
-                        # Categorize by side
-                        if is_close:
-                            center_x = (x1 + x2) / 2
-                            if center_x < frame_width / 2:
-                                left_close_vehicles.append(class_name)
-                            else:
-                                right_close_vehicles.append(class_name)
+        # Sample depth around every box center in one kernel call
+        if medians is None:
+            if depth_map is None or len(xyxy) == 0:
+                return [], []
+            medians = batch_median_depth(depth_map, xyxy, 5, frame_shape=(frame_height, frame_width))
+        
+        # Close and side masks for all boxes at once; class names are only
+        # looked up for the close vehicles
+        xyxy = np.asarray(xyxy).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+        is_close = np.asarray(medians) > CLOSE_DEPTH_THRESHOLD
+        is_left = 0.5 * (xyxy[:, 0] + xyxy[:, 2]) < 0.5 * frame_width
+        
+        left_close_vehicles = [class_names[c] for c in class_ids[is_close & is_left].tolist()]
+        right_close_vehicles = [class_names[c] for c in class_ids[is_close & ~is_left].tolist()]
         
         return left_close_vehicles, right_close_vehicles